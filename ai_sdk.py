@@ -1,36 +1,68 @@
-def _vai(type_char: str, value: Any) -> str:
-    return f"{type_char}:{json.dumps(value)}\n"
+import json
+import re
+from functools import lru_cache
+from secrets import token_hex
 
-def vai_start_step(msg_id: str)                         -> str: return _vai("f", {"messageId": msg_id})
-def vai_tool_call(tc_id, name, args)                    -> str: return _vai("9", {"toolCallId": tc_id, "toolName": name, "args": args})
-def vai_tool_result(tc_id, result)                      -> str: return _vai("a", {"toolCallId": tc_id, "result": result})
-def vai_text(token: str)                                -> str: return _vai("0", token)
-def vai_finish_step(reason: str, continued: bool)       -> str: return _vai("e", {"finishReason": reason, "usage": _ZERO_USAGE, "isContinued": continued})
-def vai_finish_message(reason: str = "stop")            -> str: return _vai("d", {"finishReason": reason, "usage": _ZERO_USAGE})
+import orjson
+
+def _vai(type_char: str, value: Any) -> bytes:
+    try:
+        body = orjson.dumps(value)
+    except TypeError:  # ints beyond 64 bits, lone surrogates — stdlib json handles them
+        body = json.dumps(value, separators=(",", ":")).encode()
+    return type_char.encode() + b":" + body + b"\n"
+
+def vai_start_step(msg_id: str)                         -> bytes: return b'f:{"messageId":"' + msg_id.encode() + b'"}\n'  # msg_id is "msg-<hex>", no escaping needed
+def vai_tool_call(tc_id, name, args)                    -> bytes: return _vai("9", {"toolCallId": tc_id, "toolName": name, "args": args})
+def vai_tool_result(tc_id, result)                      -> bytes: return _vai("a", {"toolCallId": tc_id, "result": result})
+def vai_text(token: str)                                -> bytes: return _vai("0", token)
+def _finish_step(reason: str, continued: bool)          -> bytes: return _vai("e", {"finishReason": reason, "usage": _ZERO_USAGE, "isContinued": continued})
+def _finish_message(reason: str)                        -> bytes: return _vai("d", {"finishReason": reason, "usage": _ZERO_USAGE})
+
+# Finish frames only vary by reason/continued — serialize every combination once
+_FINISH_REASONS        = ("stop", "tool-calls")
+_FINISH_STEP_FRAMES    = {(r, c): _finish_step(r, c) for r in _FINISH_REASONS for c in (False, True)}
+_FINISH_MESSAGE_FRAMES = {r: _finish_message(r) for r in _FINISH_REASONS}
+_FINISH_STEP_STOP      = _FINISH_STEP_FRAMES["stop", False]
+_FINISH_MESSAGE_STOP   = _FINISH_MESSAGE_FRAMES["stop"]
+
+def vai_finish_step(reason: str, continued: bool) -> bytes:
+    return _FINISH_STEP_FRAMES.get((reason, continued)) or _finish_step(reason, continued)
+
+def vai_finish_message(reason: str = "stop") -> bytes:
+    return _FINISH_MESSAGE_FRAMES.get(reason) or _finish_message(reason)
+
+@lru_cache(maxsize=None)
+def _to_camel(tool_name: str) -> str:
+    """snake_case tool name → camelCase, so the UI shows "queryDatabase" / "retrieveDocuments"."""
+    return "".join(w.capitalize() if i else w for i, w in enumerate(tool_name.split("_")))
+
+_ROLE_TO_MESSAGE  = {"user": HumanMessage, "assistant": AIMessage}
+_EMPTY_META: dict = {}
+_WORD_RE          = re.compile(r"\S+\s*")  # a word plus its trailing whitespace
+_TEXT_BATCH_WORDS = 8
+_SENTENCE_ENDS    = (".", "!", "?", "\n")
 
 # ---------------------------------------------------------------------------
 # Stream: use LangGraph astream_events — no manual sequencing needed
 # ---------------------------------------------------------------------------
 
-async def run_agent_stream(messages: list[dict]) -> AsyncGenerator[str, None]:
+async def run_agent_stream(messages: list[dict]) -> AsyncGenerator[bytes, None]:
     """
     LangGraph's astream_events() fires events natively as the graph executes.
     We map each event type onto the Vercel AI data stream format.
 
     Event types we handle:
       on_chain_start  (node entry)  — emit start_step
+      on_chat_model_stream          — forward planner text tokens live
       on_tool_start                 — emit tool_call
-      on_tool_end                   — emit tool_result + simulated latency
-      on_chain_end   (responder)    — stream final text word-by-word
+      on_tool_end                   — emit tool_result
+      on_chain_end   (responder)    — stream final text in word batches,
+                                      only when tools ran (otherwise the
+                                      planner tokens above already did)
     """
-    lc_messages = []
-    for m in messages:
-        role = m.get("role", "")
-        content = m.get("content", "")
-        if role == "user":
-            lc_messages.append(HumanMessage(content=content))
-        elif role == "assistant":
-            lc_messages.append(AIMessage(content=content))
+    lc_messages = [cls(content=m.get("content", ""))
+                   for m in messages if (cls := _ROLE_TO_MESSAGE.get(m.get("role")))]
 
     initial_state: AgentState = {
         "messages": lc_messages,
@@ -39,54 +71,73 @@ async def run_agent_stream(messages: list[dict]) -> AsyncGenerator[str, None]:
         "final_text": "",
     }
 
-    step_msg_id = f"msg-{uuid.uuid4().hex[:16]}"
+    step_msg_id = f"msg-{token_hex(8)}"
     yield vai_start_step(step_msg_id)
+    tools_ran = False
 
     # astream_events streams native LangGraph events as they happen
-    async for event in GRAPH.astream_events(initial_state, version="v2"):
-        kind = event.get("event")
-        name = event.get("name", "")
+    # Filtered by LangGraph before dispatch: the responder chain plus chat-model
+    # and tool runs — every other node's chain events never reach this loop
+    async for event in GRAPH.astream_events(
+        initial_state, version="v2",
+        include_names=["responder"], include_types=["chat_model", "tool"],
+    ):
+        # Unpack once; branches below are ordered by event frequency
+        kind = event["event"]
+        data = event["data"]
 
-        # ── tool about to run ────────────────────────────────────────────────
-        if kind == "on_tool_start":
-            tool_input = event["data"].get("input", {})
-            run_id    = event.get("run_id", uuid.uuid4().hex)
-            tool_name = name  # snake_case from @tool decorator
+        # ── planner LLM token — forward text immediately ─────────────────────
+        if kind == "on_chat_model_stream":
+            if (event.get("metadata") or _EMPTY_META).get("langgraph_node") == "planner":
+                ai_chunk = data["chunk"]
+                if ai_chunk.content and not ai_chunk.tool_call_chunks:
+                    yield vai_text(ai_chunk.content)
 
-            # Convert to camelCase so the UI shows "queryDatabase" / "retrieveDocuments"
-            camel = "".join(w.capitalize() if i else w for i, w in enumerate(tool_name.split("_")))
-            yield vai_tool_call(run_id, camel, tool_input)
+        # ── tool about to run ────────────────────────────────────────────────
+        elif kind == "on_tool_start":
+            tools_ran = True
+            tool_input = data.get("input", {})
+            run_id    = event["run_id"]
+            tool_name = event["name"]  # snake_case from @tool decorator
+            yield vai_tool_call(run_id, _to_camel(tool_name), tool_input)
 
         # ── tool finished ────────────────────────────────────────────────────
         elif kind == "on_tool_end":
-            run_id = event.get("run_id", uuid.uuid4().hex)
-            output = event["data"].get("output")
+            run_id = event["run_id"]
+            output = data.get("output")
             # output may be a ToolMessage or a raw dict
             result = output.content if isinstance(output, ToolMessage) else output
             if isinstance(result, str):
                 try:
-                    result = json.loads(result)
-                except (json.JSONDecodeError, TypeError):
+                    result = orjson.loads(result)
+                except (orjson.JSONDecodeError, TypeError):
                     pass
-            # Small delay to make the "Running → Completed" transition visible
-            await asyncio.sleep(0.4)
             yield vai_tool_result(run_id, result)
 
-        # ── responder node finished — stream text word-by-word ───────────────
-        elif kind == "on_chain_end" and name == "responder":
-            output_state = event["data"].get("output", {})
+        # ── responder node finished — stream text in word batches ────────────
+        elif kind == "on_chain_end" and event.get("name") == "responder":
+            output_state = data.get("output", {})
             final_text: str = output_state.get("final_text", "")
 
-            if final_text:
+            # Without tools the planner's streamed tokens were the answer
+            if final_text and tools_ran:
                 # Close the tool-calling step, open a new text step
                 yield vai_finish_step("tool-calls", continued=True)
 
-                text_msg_id = f"msg-{uuid.uuid4().hex[:16]}"
+                text_msg_id = f"msg-{token_hex(8)}"
                 yield vai_start_step(text_msg_id)
 
-                for word in final_text.split(" "):
-                    yield vai_text(word + " ")
-                    await asyncio.sleep(0.02)
+                # Flush every _TEXT_BATCH_WORDS words or at a sentence end
+                buf: list[str] = []
+                for m in _WORD_RE.finditer(final_text):
+                    word = m.group()
+                    buf.append(word)
+                    if len(buf) >= _TEXT_BATCH_WORDS or word.rstrip(" ").endswith(_SENTENCE_ENDS):
+                        yield vai_text("".join(buf))
+                        buf.clear()
+                        await asyncio.sleep(0)
+                if buf:
+                    yield vai_text("".join(buf))
 
-    yield vai_finish_step("stop", continued=False)
-    yield vai_finish_message("stop")
\ No newline at end of file
+    yield _FINISH_STEP_STOP
+    yield _FINISH_MESSAGE_STOP
\ No newline at end of file
@@ -7,7 +7,9 @@ LangGraph ReAct agent server.
 Graph: planner ↔ executor loop (ReAct style).
   planner  — LLM with tools; if it returns tool calls → executor
              else → END (its last message IS the final answer)
-  executor — runs each tool, appends ToolMessages, loops back to planner
+  executor — runs the round's tools concurrently, appends ToolMessages,
+             loops back to planner; each tool_result SSE is sent as soon
+             as that tool finishes, not when the whole round does
 
 Special path:
   If any tool requires approval, route to interrupt_node first.
@@ -20,18 +22,31 @@ Custom SSE extensions (layered on top of OpenAI SSE format):
                       "details":{...},"thread_id":"..."}}
 """
 
+import ast
 import asyncio
+import contextlib
+import functools
+import importlib.util
 import json
+import logging
+import logging.handlers
 import math
 import os
+import queue
+import re
 import time
 import uuid
-from typing import Any, AsyncGenerator, TypedDict
+from collections import deque
+from secrets import token_hex
+from types import MappingProxyType
+from typing import Any, AsyncGenerator, Callable, TypedDict
 
+import httpx
+import orjson
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
@@ -40,6 +55,35 @@ from langgraph.graph import END, StateGraph
 from langgraph.types import Command, interrupt
 
 
+# ---------------------------------------------------------------------------
+# Logging — records are queued and written to stderr by a listener thread,
+# so a slow stderr never blocks the event loop mid-stream
+# ---------------------------------------------------------------------------
+
+_log_queue = queue.SimpleQueue()
+_log       = logging.getLogger("agent_server")
+_log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log.propagate = False
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()   # stopped in _lifespan so queued records are flushed on shutdown
+
+
+# ---------------------------------------------------------------------------
+# JSON encoding — orjson on the hot path; stdlib json covers what orjson
+# rejects (ints beyond 64 bits, lone surrogates) so one value can't kill a stream
+# ---------------------------------------------------------------------------
+
+def _json_bytes(value: Any) -> bytes:
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _json_str(value: Any) -> str:
+    return _json_bytes(value).decode()
+
+
 # ---------------------------------------------------------------------------
 # LLM configuration
 # ---------------------------------------------------------------------------
@@ -51,11 +95,24 @@ _LLM_MODEL    = os.environ.get("LLM_MODEL",    "openai/gpt-4o-mini")
 if not _LLM_API_KEY:
     raise RuntimeError("LLM_API_KEY env var is required")
 
+# One pooled client shared by every request; HTTP/2 multiplexes concurrent
+# streams over a single connection when the optional h2 package is installed
+_LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+_llm_http_client = httpx.AsyncClient(
+    http2=importlib.util.find_spec("h2") is not None,
+    limits=httpx.Limits(max_connections=_LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=_LLM_MAX_CONNECTIONS // 2),
+)
+
 _llm = ChatOpenAI(
     base_url=_LLM_BASE_URL,
     api_key=_LLM_API_KEY,
     model=_LLM_MODEL,
     streaming=True,
+    # Set here, not on the httpx client: the OpenAI SDK sends its own per-request
+    # timeout, which would otherwise override the client default with None
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    http_async_client=_llm_http_client,
 )
 
 
@@ -63,6 +120,53 @@ _llm = ChatOpenAI(
 # Tools
 # ---------------------------------------------------------------------------
 
+# Static fixture data for query_database, built once at import and shared by all
+# requests. The lookup tables and row tuples are read-only; the rows themselves stay
+# plain dicts (orjson/json can't serialize mappingproxy), so tools must not mutate them.
+_DB_TABLES = MappingProxyType({
+    "products": (
+        {"id": 1, "name": "Widget Pro",  "revenue": 42_000, "units": 840,  "quarter": "Q4 2024"},
+        {"id": 2, "name": "Gadget Max",  "revenue": 31_500, "units": 630,  "quarter": "Q4 2024"},
+        {"id": 3, "name": "Device Lite", "revenue": 18_750, "units": 1_250, "quarter": "Q4 2024"},
+        {"id": 4, "name": "Cloud Suite", "revenue": 95_000, "units": 190,  "quarter": "Q4 2024"},
+        {"id": 5, "name": "Analytics+",  "revenue": 67_200, "units": 448,  "quarter": "Q4 2024"},
+    ),
+    "orders": (
+        {"order_id": 1001, "customer": "Alice Chen",   "amount": 2_400, "date": "2024-10-15"},
+        {"order_id": 1002, "customer": "Bob Martinez", "amount":   149, "date": "2024-10-22"},
+        {"order_id": 1003, "customer": "Carol Smith",  "amount": 1_800, "date": "2024-11-03"},
+        {"order_id": 1004, "customer": "David Lee",    "amount":   320, "date": "2024-11-18"},
+        {"order_id": 1005, "customer": "Eva Patel",    "amount": 4_500, "date": "2024-12-01"},
+        {"order_id": 1006, "customer": "Frank Wu",     "amount":   980, "date": "2024-12-08"},
+        {"order_id": 1007, "customer": "Grace Kim",    "amount": 2_150, "date": "2024-12-14"},
+        {"order_id": 1008, "customer": "Henry James",  "amount":   720, "date": "2024-12-20"},
+    ),
+    "users": (
+        {"id": 1, "name": "Alice Chen",   "plan": "enterprise", "mrr": 2_400},
+        {"id": 2, "name": "Bob Martinez", "plan": "pro",        "mrr":   149},
+        {"id": 3, "name": "Carol Smith",  "plan": "enterprise", "mrr": 1_800},
+    ),
+    "metrics": (
+        {"metric": "total_mrr",    "value": 284_000, "change_pct": 12.3},
+        {"metric": "churn_rate",   "value":     2.1, "change_pct": -0.4},
+        {"metric": "nps_score",    "value":      67, "change_pct":  3.2},
+        {"metric": "active_users", "value":  14_820, "change_pct":  8.7},
+    ),
+})
+
+_DB_RESPONSES = MappingProxyType({
+    table: {"table": table, "row_count": len(rows), "rows": rows}
+    for table, rows in _DB_TABLES.items()
+})
+
+# One regex pass finds every routing keyword; the first table in _DB_ROUTE_ORDER
+# that any of them maps to wins, matching the original if/elif precedence
+_DB_KEYWORD_RE    = re.compile(r"order|user|metric|kpi|mrr", re.IGNORECASE)
+_DB_KEYWORD_TABLE = MappingProxyType({"order": "orders", "user": "users",
+                                      "metric": "metrics", "kpi": "metrics", "mrr": "metrics"})
+_DB_ROUTE_ORDER   = ("orders", "users", "metrics")
+
+
 @tool
 def query_database(sql: str) -> dict:
     """Query the internal analytics database. Read-only; returns rows matching the query.
@@ -70,45 +174,9 @@ def query_database(sql: str) -> dict:
     Args:
         sql: SQL-like query string describing what data to fetch
     """
-    all_data = {
-        "products": [
-            {"id": 1, "name": "Widget Pro",  "revenue": 42_000, "units": 840,  "quarter": "Q4 2024"},
-            {"id": 2, "name": "Gadget Max",  "revenue": 31_500, "units": 630,  "quarter": "Q4 2024"},
-            {"id": 3, "name": "Device Lite", "revenue": 18_750, "units": 1_250, "quarter": "Q4 2024"},
-            {"id": 4, "name": "Cloud Suite", "revenue": 95_000, "units": 190,  "quarter": "Q4 2024"},
-            {"id": 5, "name": "Analytics+",  "revenue": 67_200, "units": 448,  "quarter": "Q4 2024"},
-        ],
-        "orders": [
-            {"order_id": 1001, "customer": "Alice Chen",   "amount": 2_400, "date": "2024-10-15"},
-            {"order_id": 1002, "customer": "Bob Martinez", "amount":   149, "date": "2024-10-22"},
-            {"order_id": 1003, "customer": "Carol Smith",  "amount": 1_800, "date": "2024-11-03"},
-            {"order_id": 1004, "customer": "David Lee",    "amount":   320, "date": "2024-11-18"},
-            {"order_id": 1005, "customer": "Eva Patel",    "amount": 4_500, "date": "2024-12-01"},
-            {"order_id": 1006, "customer": "Frank Wu",     "amount":   980, "date": "2024-12-08"},
-            {"order_id": 1007, "customer": "Grace Kim",    "amount": 2_150, "date": "2024-12-14"},
-            {"order_id": 1008, "customer": "Henry James",  "amount":   720, "date": "2024-12-20"},
-        ],
-        "users": [
-            {"id": 1, "name": "Alice Chen",   "plan": "enterprise", "mrr": 2_400},
-            {"id": 2, "name": "Bob Martinez", "plan": "pro",        "mrr":   149},
-            {"id": 3, "name": "Carol Smith",  "plan": "enterprise", "mrr": 1_800},
-        ],
-        "metrics": [
-            {"metric": "total_mrr",    "value": 284_000, "change_pct": 12.3},
-            {"metric": "churn_rate",   "value":     2.1, "change_pct": -0.4},
-            {"metric": "nps_score",    "value":      67, "change_pct":  3.2},
-            {"metric": "active_users", "value":  14_820, "change_pct":  8.7},
-        ],
-    }
-    sql_lower = sql.lower()
-    if "order" in sql_lower:
-        return {"query": sql, "table": "orders", "row_count": 8, "rows": all_data["orders"]}
-    elif "user" in sql_lower:
-        return {"query": sql, "table": "users",  "row_count": 3, "rows": all_data["users"]}
-    elif "metric" in sql_lower or "kpi" in sql_lower or "mrr" in sql_lower:
-        return {"query": sql, "table": "metrics", "row_count": 4, "rows": all_data["metrics"]}
-    else:
-        return {"query": sql, "table": "products", "row_count": 5, "rows": all_data["products"]}
+    hits = {_DB_KEYWORD_TABLE[m.lower()] for m in _DB_KEYWORD_RE.findall(sql)}
+    table = next((t for t in _DB_ROUTE_ORDER if t in hits), "products")
+    return {"query": sql, **_DB_RESPONSES[table]}
 
 
 @tool
@@ -130,6 +198,20 @@ def write_database(table: str, operation: str, data: dict) -> dict:
     }
 
 
+# Shared like the _DB_TABLES rows: tuple is read-only, the dicts must not be mutated
+_DOCS = (
+    {"id": "doc_001", "title": "Q4 2024 Business Performance Report",
+     "content": "Revenue exceeded targets by 12%. Enterprise segment grew 24% YoY. Cloud Suite became the top-selling product.",
+     "score": 0.96, "source": "reports/q4-2024-performance.pdf"},
+    {"id": "doc_002", "title": "Competitive Landscape Analysis",
+     "content": "Market share grew from 19.1% to 23.4%. Three main competitors: Acme Corp (31%), TechCo (18%), NovaSoft (12%).",
+     "score": 0.89, "source": "research/competitive-analysis-2024.pdf"},
+    {"id": "doc_003", "title": "Product Roadmap 2025",
+     "content": "Q1: AI assistant integration. Q2: API-first redesign. Q3: Mobile apps. Q4: Enterprise SSO.",
+     "score": 0.83, "source": "product/roadmap-2025.md"},
+)
+
+
 @tool
 def retrieve_documents(query: str, top_k: int = 3) -> dict:
     """Search the knowledge base using semantic similarity.
@@ -138,18 +220,20 @@ def retrieve_documents(query: str, top_k: int = 3) -> dict:
         query: Natural language search query
         top_k: Number of documents to retrieve (default 3, max 5)
     """
-    docs = [
-        {"id": "doc_001", "title": "Q4 2024 Business Performance Report",
-         "content": "Revenue exceeded targets by 12%. Enterprise segment grew 24% YoY. Cloud Suite became the top-selling product.",
-         "score": 0.96, "source": "reports/q4-2024-performance.pdf"},
-        {"id": "doc_002", "title": "Competitive Landscape Analysis",
-         "content": "Market share grew from 19.1% to 23.4%. Three main competitors: Acme Corp (31%), TechCo (18%), NovaSoft (12%).",
-         "score": 0.89, "source": "research/competitive-analysis-2024.pdf"},
-        {"id": "doc_003", "title": "Product Roadmap 2025",
-         "content": "Q1: AI assistant integration. Q2: API-first redesign. Q3: Mobile apps. Q4: Enterprise SSO.",
-         "score": 0.83, "source": "product/roadmap-2025.md"},
-    ]
-    return {"query": query, "total_retrieved": min(int(top_k), 5), "documents": docs[:top_k]}
+    return {"query": query, "total_retrieved": min(int(top_k), 5), "documents": _DOCS[:top_k]}
+
+
+# The first two results are static; the third quotes the query back
+_WEB_RESULTS = (
+    {"url": "https://techcrunch.com/2025/02/ai-market-growth",
+     "title": "AI Market Expected to Reach $1.8T by 2030",
+     "snippet": "Analysts project 38% CAGR. Enterprise adoption is the primary driver.",
+     "published": "2025-02-18"},
+    {"url": "https://gartner.com/insights/2025-tech-predictions",
+     "title": "Gartner's Top 10 Tech Trends for 2025",
+     "snippet": "AI agents and autonomous systems top the list. 80% of enterprises will deploy at least one AI agent by end of 2025.",
+     "published": "2025-01-15"},
+)
 
 
 @tool
@@ -160,23 +244,43 @@ def web_search(query: str, num_results: int = 4) -> dict:
         query:       Search query string
         num_results: Number of results to return (default 4)
     """
-    results = [
-        {"url": "https://techcrunch.com/2025/02/ai-market-growth",
-         "title": "AI Market Expected to Reach $1.8T by 2030",
-         "snippet": "Analysts project 38% CAGR. Enterprise adoption is the primary driver.",
-         "published": "2025-02-18"},
-        {"url": "https://gartner.com/insights/2025-tech-predictions",
-         "title": "Gartner's Top 10 Tech Trends for 2025",
-         "snippet": "AI agents and autonomous systems top the list. 80% of enterprises will deploy at least one AI agent by end of 2025.",
-         "published": "2025-01-15"},
-        {"url": "https://bloomberg.com/news/saas-consolidation-2025",
-         "title": "SaaS Consolidation Wave Accelerates",
-         "snippet": f"Related to '{query}': Major SaaS players acquiring AI startups. M&A activity up 67%.",
-         "published": "2025-02-10"},
-    ]
+    results = [*_WEB_RESULTS,
+               {"url": "https://bloomberg.com/news/saas-consolidation-2025",
+                "title": "SaaS Consolidation Wave Accelerates",
+                "snippet": f"Related to '{query}': Major SaaS players acquiring AI startups. M&A activity up 67%.",
+                "published": "2025-02-10"}]
     return {"query": query, "results": results[:num_results]}
 
 
+# eval() requires a real dict for globals; whitelisted expressions can't assign to it
+_CALC_GLOBALS = {"__builtins__": {}}
+_CALC_NAMES   = MappingProxyType({
+    **{k: v for k, v in math.__dict__.items() if not k.startswith("_")},
+    "abs": abs, "round": round, "min": min, "max": max, "sum": sum,
+})
+
+
+# Arithmetic, comparisons, and/or, conditionals, calls and literal tuples/lists —
+# no attributes, subscripts, lambdas or comprehensions, so eval() can't reach past _CALC_NAMES
+_CALC_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.operator, ast.unaryop,
+               ast.Compare, ast.cmpop, ast.BoolOp, ast.boolop, ast.IfExp,
+               ast.Call, ast.keyword, ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expression(expression: str):
+    """Validate and compile an expression once; repeats are served from the cache."""
+    tree = ast.parse(expression, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _CALC_NODES):
+            raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id not in _CALC_NAMES:
+            raise ValueError(f"Unknown name: {node.id}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, complex)):
+            raise ValueError(f"Unsupported constant: {node.value!r}")
+    return compile(tree, "<calculate>", "eval")
+
+
 @tool
 def calculate(expression: str) -> dict:
     """Evaluate a mathematical expression.
@@ -185,9 +289,7 @@ def calculate(expression: str) -> dict:
         expression: A math expression e.g. '50000 / 8', 'sqrt(2500)', '(95000 + 67200) / 2'
     """
     try:
-        allowed = {k: v for k, v in math.__dict__.items() if not k.startswith("_")}
-        allowed.update({"abs": abs, "round": round, "min": min, "max": max, "sum": sum})
-        result = eval(expression, {"__builtins__": {}}, allowed)  # noqa: S307
+        result = eval(_compile_expression(expression), _CALC_GLOBALS, _CALC_NAMES)  # noqa: S307
         return {
             "expression": expression,
             "result": result,
@@ -198,8 +300,20 @@ def calculate(expression: str) -> dict:
 
 
 TOOLS            = [query_database, write_database, retrieve_documents, web_search, calculate]
-TOOLS_BY_NAME    = {t.name: t for t in TOOLS}
-APPROVAL_REQUIRED_TOOLS = {"write_database"}
+TOOLS_BY_NAME    = MappingProxyType({t.name: t for t in TOOLS})
+APPROVAL_REQUIRED_TOOLS = frozenset({"write_database"})
+
+# Cap on tool calls running at once across all requests (sync tools use the thread pool);
+# per worker process, so the server-wide cap is this × WEB_CONCURRENCY
+_TOOL_CONCURRENCY_LIMIT = int(os.environ.get("TOOL_CONCURRENCY_LIMIT", "8"))
+_tool_semaphore         = asyncio.Semaphore(_TOOL_CONCURRENCY_LIMIT)
+
+# Demo-only pauses so the UI's Running badge stays visible; both are off unless
+# DEMO_MODE=1, which restores the original 0.4 s before each tool_result frame and
+# 0.3 s after each executor round (TOOL_UI_DELAY_MS overrides the latter)
+_DEMO_MODE         = os.environ.get("DEMO_MODE", "0") == "1"
+_RESULT_UI_DELAY_S = 0.4 if _DEMO_MODE else 0
+_TOOL_UI_DELAY_S   = int(os.environ.get("TOOL_UI_DELAY_MS", "300" if _DEMO_MODE else "0")) / 1000
 
 _llm_with_tools = _llm.bind_tools(TOOLS)
 
@@ -216,38 +330,40 @@ class AgentState(TypedDict):
 
 
 # ---------------------------------------------------------------------------
-# Graph nodes
+# Graph nodes — each returns only the keys it changes; LangGraph merges them
 # ---------------------------------------------------------------------------
 
-def planner_node(state: AgentState) -> AgentState:
+def _get_tool_calls(msg: Any) -> list | tuple:
+    """Tool calls on an AIMessage; an empty tuple for any other message type."""
+    return getattr(msg, "tool_calls", None) or ()
+
+
+async def planner_node(state: AgentState) -> dict:
     """LLM decides next action.  If it returns tool_calls → executor.
     If it returns plain text → route_after_planner sends us to END."""
-    response = _llm_with_tools.invoke(state["messages"])
+    response = await _llm_with_tools.ainvoke(state["messages"])
     return {
-        **state,
         "messages": state["messages"] + [response],
         "_step":    state.get("_step", 0) + 1,
     }
 
 
 def route_after_planner(state: AgentState) -> str:
-    last = state["messages"][-1]
-    tool_calls = getattr(last, "tool_calls", None) or []
+    tool_calls = _get_tool_calls(state["messages"][-1])
     if not tool_calls or state.get("_step", 0) >= 6:
         return "end"   # Final answer or safety limit reached
     needs_approval = any(tc["name"] in APPROVAL_REQUIRED_TOOLS for tc in tool_calls)
     return "interrupt" if needs_approval else "executor"
 
 
-def interrupt_node(state: AgentState) -> AgentState:
+def interrupt_node(state: AgentState) -> dict:
     """Pause graph and ask the user for approval before a protected tool runs."""
-    last  = state["messages"][-1]
-    calls = [tc for tc in (getattr(last, "tool_calls", None) or [])
-             if tc["name"] in APPROVAL_REQUIRED_TOOLS]
-    if not calls:
-        return state
+    # Only the first protected call is needed; stop scanning once it's found
+    call = next((tc for tc in _get_tool_calls(state["messages"][-1])
+                 if tc["name"] in APPROVAL_REQUIRED_TOOLS), None)
+    if call is None:
+        return {}
 
-    call = calls[0]
     payload = {
         "toolCallId": call["id"],
         "toolName":   call["name"],
@@ -267,57 +383,84 @@ def interrupt_node(state: AgentState) -> AgentState:
     # Graph suspends here; resumes when client calls /v1/agent/resume
     action: str = interrupt(payload)
 
-    approvals = dict(state.get("approvals") or {})
-    approvals[call["id"]] = action
-    return {**state, "approvals": approvals}
+    return {"approvals": {**(state.get("approvals") or {}), call["id"]: action}}
 
 
-async def executor_node(state: AgentState) -> AgentState:
-    """Execute all tool calls from the latest AIMessage, append ToolMessages."""
-    last      = state["messages"][-1]
-    tool_calls = getattr(last, "tool_calls", None) or []
-    approvals  = state.get("approvals") or {}
-    tool_msgs: list = []
-
-    for tc in tool_calls:
-        name    = tc["name"]
-        call_id = tc["id"]
-
-        if name in APPROVAL_REQUIRED_TOOLS:
-            action = approvals.get(call_id, "denied")
-            if action != "approved":
-                result = {"status": f"Operation {action} by user", "success": False}
-                tool_msgs.append(ToolMessage(
-                    content=json.dumps(result), tool_call_id=call_id, name=name))
-                continue
+def _denied_tool_message(tc: dict, approvals: dict) -> ToolMessage | None:
+    """ToolMessage recording a protected call the user did not approve, else None."""
+    if tc["name"] not in APPROVAL_REQUIRED_TOOLS:
+        return None
+    action = approvals.get(tc["id"], "denied")
+    if action == "approved":
+        return None
+    result = {"status": f"Operation {action} by user", "success": False}
+    return ToolMessage(content=_json_str(result), tool_call_id=tc["id"], name=tc["name"])
+
 
-        fn = TOOLS_BY_NAME.get(name)
-        if fn:
-            try:
-                result = fn.invoke(tc["args"])
-            except Exception as exc:
-                result = {"error": str(exc)}
-        else:
-            result = {"error": f"Unknown tool: {name}"}
+async def _run_tool_call(tc: dict) -> ToolMessage:
+    """Run one (approved) tool call and wrap the result in a ToolMessage."""
+    name    = tc["name"]
+    call_id = tc["id"]
+
+    fn = TOOLS_BY_NAME.get(name)
+    if fn:
+        try:
+            async with _tool_semaphore:
+                # Tag the run so on_tool_end can be matched back to this call ID
+                result = await fn.ainvoke(tc["args"], config={"metadata": {"tool_call_id": call_id}})
+        except Exception as exc:
+            result = {"error": str(exc)}
+    else:
+        result = {"error": f"Unknown tool: {name}"}
+
+    return ToolMessage(
+        content=_json_str(result) if isinstance(result, dict) else str(result),
+        tool_call_id=call_id,
+        name=name,
+    )
+
+
+async def executor_node(state: AgentState) -> dict:
+    """Execute all tool calls from the latest AIMessage concurrently, append ToolMessages."""
+    tool_calls = _get_tool_calls(state["messages"][-1])
+    approvals  = state.get("approvals") or {}
 
-        tool_msgs.append(ToolMessage(
-            content=json.dumps(result) if isinstance(result, dict) else str(result),
-            tool_call_id=call_id,
-            name=name,
-        ))
-        await asyncio.sleep(0.3)  # Slight delay so Running badge is briefly visible
+    # Denied calls are answered inline; only the rest are scheduled as tasks.
+    # Tool calls in one round are independent; results keep call order.
+    tool_msgs = [_denied_tool_message(tc, approvals) for tc in tool_calls]
+    to_run    = [i for i, msg in enumerate(tool_msgs) if msg is None]
+    if to_run:
+        ran = await asyncio.gather(*(_run_tool_call(tool_calls[i]) for i in to_run))
+        for i, msg in zip(to_run, ran):
+            tool_msgs[i] = msg
+        if _TOOL_UI_DELAY_S:
+            await asyncio.sleep(_TOOL_UI_DELAY_S)
 
-    return {**state, "messages": state["messages"] + tool_msgs}
+    return {"messages": state["messages"] + tool_msgs}
 
 
 # ---------------------------------------------------------------------------
 # Build graph
 # ---------------------------------------------------------------------------
 
+# Set CHECKPOINT_DB to a file path to keep checkpoints in SQLite (needs the
+# langgraph-checkpoint-sqlite package); the default MemorySaver is per-process.
+# The SQLite saver needs a running event loop, so _lifespan swaps it in at startup.
+_CHECKPOINT_DB = os.environ.get("CHECKPOINT_DB", "")
+
+# SQLite threads idle longer than CHECKPOINT_TTL_HOURS are deleted by an hourly sweep,
+# so anonymous one-off threads don't accumulate on disk
+_CHECKPOINT_TTL_S   = float(os.environ.get("CHECKPOINT_TTL_HOURS", "24")) * 3600
+_CHECKPOINT_SWEEP_S = 3600
+
 _memory = MemorySaver()
 
+# Persist once when a run exits (final answer or interrupt() pause) instead of
+# after every super-step; nothing reads mid-run checkpoints
+_CHECKPOINT_DURABILITY = "exit"
 
-def _build_graph():
+
+def _build_graph(checkpointer):
     wf = StateGraph(AgentState)
 
     wf.add_node("planner",       planner_node)
@@ -334,26 +477,113 @@ def _build_graph():
     wf.add_edge("interrupt_node", "executor")
     wf.add_edge("executor",       "planner")   # ← ReAct loop back
 
-    return wf.compile(checkpointer=_memory)
+    return wf.compile(checkpointer=checkpointer)
+
 
+GRAPH = _build_graph(_memory)
 
-GRAPH = _build_graph()
+
+def _checkpoint_id_at(unix_s: float) -> str:
+    """Lowest checkpoint_id LangGraph can mint at unix_s.
+
+    Checkpoint IDs are UUIDv6, whose string form sorts by creation time (the
+    savers rely on this for ORDER BY checkpoint_id), so this works as a cutoff.
+    """
+    ts = int(unix_s * 10_000_000) + 0x01B21DD213814000  # 100 ns ticks since 1582-10-15
+    return str(uuid.UUID(int=(ts >> 12) << 80 | 6 << 76 | (ts & 0x0FFF) << 64 | 0b10 << 62))
+
+
+async def _sweep_expired_threads(saver) -> None:
+    """Delete every thread whose newest checkpoint is older than the TTL, hourly."""
+    await saver.setup()
+    while True:
+        cutoff = _checkpoint_id_at(time.time() - _CHECKPOINT_TTL_S)
+        try:
+            async with saver.lock, saver.conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(checkpoint_id) < ?",
+                (cutoff,),
+            ) as cur:
+                expired = [row[0] for row in await cur.fetchall()]
+            for thread_id in expired:
+                await saver.adelete_thread(thread_id)
+            if expired:
+                _log.info("[checkpoint] Deleted %d expired threads", len(expired))
+        except Exception:
+            _log.exception("[checkpoint] TTL sweep failed")
+        await asyncio.sleep(_CHECKPOINT_SWEEP_S)
+
+
+async def _stop_task(task: asyncio.Task) -> None:
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(app):
+    """Own the app's long-lived resources; the exit stack releases them in reverse.
+
+    With CHECKPOINT_DB set, GRAPH is rebuilt on an AsyncSqliteSaver (it needs the
+    running loop) and the TTL sweeper runs for the app's lifetime.
+    """
+    global _memory, GRAPH
+    async with contextlib.AsyncExitStack() as stack:
+        stack.callback(_log_listener.stop)   # last out, so shutdown errors still get written
+        stack.push_async_callback(_llm_http_client.aclose)
+
+        if _CHECKPOINT_DB:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            saver = await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(_CHECKPOINT_DB))
+            _memory, GRAPH = saver, _build_graph(saver)
+            stack.push_async_callback(_stop_task, asyncio.create_task(_sweep_expired_threads(saver)))
+
+        yield
 
 
 # ---------------------------------------------------------------------------
 # SSE helpers
 # ---------------------------------------------------------------------------
 
-def sse(data: Any) -> str:
-    return f"data: {json.dumps(data)}\n\n"
+_DONE_FRAME = b"data: [DONE]\n\n"
+_EMPTY_META: dict = {}
+
+# _process_events only dispatches on chat-model and tool events, plus the root
+# graph's own stream (to spot interrupts); letting LangGraph drop per-node chain
+# events saves a dispatch each
+_STREAM_EVENT_TYPES = ["chat_model", "tool"]
+_STREAM_EVENT_NAMES = [GRAPH.name]
 
 
-def openai_chunk(request_id: str, delta: dict, finish_reason: str | None = None) -> str:
-    return sse({
-        "id": request_id,
-        "object": "chat.completion.chunk",
-        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
-    })
+def sse(data: Any) -> bytes:
+    return b"data: " + _json_bytes(data) + b"\n\n"
+
+
+def openai_chunker(request_id: str) -> Callable[..., bytes]:
+    """Return a chunk builder for one request.
+
+    The envelope around ``delta`` is identical for every chunk of a request, so it
+    is serialized once here and only ``delta`` / ``finish_reason`` are encoded per call.
+    """
+    prefix = (b'data: {"id":' + orjson.dumps(request_id)
+              + b',"object":"chat.completion.chunk","choices":[{"index":0,"delta":')
+
+    def chunk(delta: dict, finish_reason: str | None = None) -> bytes:
+        return (prefix + _json_bytes(delta)
+                + b',"finish_reason":' + orjson.dumps(finish_reason) + b"}]}\n\n")
+
+    return chunk
+
+
+def _progress_frame(phase: str, message: str) -> bytes:
+    return sse({"agent_progress": {"phase": phase, "message": message}})
+
+
+# Progress frames are constant per phase (and per tool), so they're encoded once
+_PROGRESS_PLANNING = _progress_frame("planning", "Analyzing...")
+_PROGRESS_RUNNING  = MappingProxyType({
+    name: _progress_frame("executing", f"Running {name}...") for name in TOOLS_BY_NAME
+})
 
 
 # ---------------------------------------------------------------------------
@@ -362,54 +592,46 @@ def openai_chunk(request_id: str, delta: dict, finish_reason: str | None = None)
 
 async def _process_events(
     event_stream: AsyncGenerator,
-    chunk_fn,
-    pending_tool_call_ids: list,  # mutable list — caller owns it
-) -> AsyncGenerator[str, None]:
+    chunk_fn: Callable[..., bytes],
+    pending_tool_call_ids: deque[str],  # mutable FIFO — caller owns it
+    flags: dict[str, bool],             # out-params, read by the caller after the loop
+) -> AsyncGenerator[bytes, None]:
     """
-    Processes astream_events for a ReAct loop and yields SSE strings.
+    Processes astream_events for a ReAct loop and yields encoded SSE frames (bytes).
 
     Progress is inferred from standard LangGraph events:
       on_chat_model_start (planner) → "planning" phase (fires every round)
       on_tool_start                 → "executing" phase per tool
+
+    Sets flags["settled"] when the run finished naturally or its interrupt was
+    already streamed, so the caller can skip re-reading the checkpoint.
     """
     had_natural_finish = False
+    interrupted        = False
 
     async for event in event_stream:
-        kind = event.get("event", "")
-        name = event.get("name", "")
-        node = event.get("metadata", {}).get("langgraph_node", "")
-
-        # ── Progress inferred from standard events ─────────────────────────
-        if kind == "on_chat_model_start" and node == "planner":
-            yield sse({"agent_progress": {
-                "phase": "planning", "message": "Analyzing...",
-            }})
-            continue
-
-        if kind == "on_tool_start":
-            yield sse({"agent_progress": {
-                "phase": "executing", "message": f"Running {name}...",
-            }})
-            continue
+        # Unpack once; branches below are ordered by event frequency
+        kind = event["event"]
+        data = event["data"]
+        meta = event.get("metadata") or _EMPTY_META
+        node = meta.get("langgraph_node", "")
 
         # ── Planner LLM: live token / tool-call streaming ──────────────────
-        if kind == "on_chat_model_stream" and node == "planner":
-            ai_chunk = event["data"]["chunk"]
+        if kind == "on_chat_model_stream":
+            if node != "planner":
+                continue
+            ai_chunk = data["chunk"]
+            akw      = ai_chunk.additional_kwargs
+            tcc_list = ai_chunk.tool_call_chunks
             delta: dict = {}
 
-            reasoning = (
-                ai_chunk.additional_kwargs.get("reasoning_content")
-                or ai_chunk.additional_kwargs.get("reasoning")
-            )
+            reasoning = akw.get("reasoning_content") or akw.get("reasoning")
             if reasoning:
                 delta["reasoning_content"] = reasoning
 
-            if ai_chunk.content and not ai_chunk.tool_call_chunks:
-                delta["content"] = ai_chunk.content
-
-            if ai_chunk.tool_call_chunks:
+            if tcc_list:
                 tc_deltas = []
-                for tcc in ai_chunk.tool_call_chunks:
+                for tcc in tcc_list:
                     td: dict = {"index": tcc.get("index", 0)}
                     if tcc.get("id"):
                         td["id"]       = tcc["id"]
@@ -418,17 +640,29 @@ async def _process_events(
                     if tcc.get("args"):
                         td.setdefault("function", {})["arguments"] = tcc["args"]
                     tc_deltas.append(td)
-                if tc_deltas:
-                    delta["tool_calls"] = tc_deltas
+                delta["tool_calls"] = tc_deltas
+            elif ai_chunk.content:
+                delta["content"] = ai_chunk.content
 
             if delta:
                 yield chunk_fn(delta)
 
+        # ── Progress inferred from standard events ─────────────────────────
+        elif kind == "on_chat_model_start":
+            if node == "planner":
+                yield _PROGRESS_PLANNING
+
+        elif kind == "on_tool_start":
+            name = event["name"]
+            yield _PROGRESS_RUNNING.get(name) or _progress_frame("executing", f"Running {name}...")
+
         # ── Planner LLM: finished ──────────────────────────────────────────
-        elif kind == "on_chat_model_end" and node == "planner":
-            output = event["data"]["output"]
+        elif kind == "on_chat_model_end":
+            if node != "planner":
+                continue
+            output = data["output"]
             if output.tool_calls:
-                # Queue tool call IDs so on_tool_end can correlate (FIFO)
+                # Queue tool call IDs as a fallback for untagged on_tool_end events
                 pending_tool_call_ids.extend(tc["id"] for tc in output.tool_calls)
                 yield chunk_fn({}, finish_reason="tool_calls")
             else:
@@ -437,50 +671,93 @@ async def _process_events(
 
         # ── Tool completed ─────────────────────────────────────────────────
         elif kind == "on_tool_end":
-            # Match to queued tool call ID (sequential execution → FIFO is correct)
-            tc_id = (pending_tool_call_ids.pop(0)
-                     if pending_tool_call_ids
-                     else event.get("run_id", uuid.uuid4().hex))
+            # executor_node tags each run with its tool call ID, which stays correct
+            # when one round calls the same tool twice; the FIFO is only a fallback.
+            tc_id = meta.get("tool_call_id")
+            if tc_id:
+                if tc_id in pending_tool_call_ids:
+                    pending_tool_call_ids.remove(tc_id)
+            else:
+                tc_id = (pending_tool_call_ids.popleft()
+                         if pending_tool_call_ids
+                         else event["run_id"])
 
-            raw = event["data"].get("output")
-            if isinstance(raw, ToolMessage):
+            # Our tools return dicts, passed through as-is; a ToolMessage is unwrapped
+            raw = data.get("output")
+            if isinstance(raw, dict):
+                result = raw
+            elif isinstance(raw, ToolMessage):
                 try:
-                    result = json.loads(raw.content) if isinstance(raw.content, str) else raw.content
-                except (json.JSONDecodeError, TypeError):
+                    result = orjson.loads(raw.content) if isinstance(raw.content, str) else raw.content
+                except (orjson.JSONDecodeError, TypeError):
                     result = raw.content
-            elif isinstance(raw, dict):
-                result = raw
             else:
                 result = str(raw) if raw is not None else None
 
-            await asyncio.sleep(0.4)  # Brief pause so Running badge is visible
-            yield sse({"tool_result": {"toolCallId": tc_id, "toolName": name, "result": result}})
+            if _RESULT_UI_DELAY_S:
+                await asyncio.sleep(_RESULT_UI_DELAY_S)
+            yield sse({"tool_result": {"toolCallId": tc_id, "toolName": event["name"], "result": result}})
+
+        # ── Graph suspended in interrupt_node — surfaced in the root stream ──
+        elif kind == "on_chain_stream":
+            out = data.get("chunk")
+            interrupts = out.get("__interrupt__") if isinstance(out, dict) else None
+            if interrupts:
+                interrupted = True
+                yield sse({"tool_interrupt": interrupts[0].value})
 
-    if had_natural_finish:
-        yield "__HAD_NATURAL_FINISH__"
+    flags["settled"] = had_natural_finish or interrupted
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint reads — raw aget_tuple avoids building a full StateSnapshot;
+# aget_state is kept as the fallback if the raw layout ever differs
+# ---------------------------------------------------------------------------
+
+_RAW_CHECKPOINT_ERRORS = (AttributeError, KeyError, TypeError, IndexError)
+
+
+async def _last_message(thread_config: dict) -> Any:
+    try:
+        tup = await _memory.aget_tuple(thread_config)
+        return tup.checkpoint["channel_values"]["messages"][-1]
+    except _RAW_CHECKPOINT_ERRORS:
+        state = await GRAPH.aget_state(thread_config)
+        return state.values.get("messages", [])[-1]
+
+
+async def _pending_interrupt(thread_config: dict) -> Any | None:
+    """Payload of the interrupt the thread is paused on, or None."""
+    try:
+        tup = await _memory.aget_tuple(thread_config)
+        if tup is None:
+            return None
+        for _task_id, channel, value in tup.pending_writes or ():
+            if channel == "__interrupt__":
+                return (value[0] if isinstance(value, (list, tuple)) else value).value
+        return None
+    except _RAW_CHECKPOINT_ERRORS:
+        state = await GRAPH.aget_state(thread_config)
+        return state.interrupts[0].value if state.interrupts else None
 
 
 # ---------------------------------------------------------------------------
 # Agent stream (new conversation turn)
 # ---------------------------------------------------------------------------
 
+# Client roles we forward to the graph; anything else (e.g. "system") is dropped
+_ROLE_TO_MESSAGE = {"user": HumanMessage, "assistant": AIMessage}
+
+
 async def run_agent_stream(
     messages: list[dict],
     thread_id: str,
-) -> AsyncGenerator[str, None]:
-    request_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+) -> AsyncGenerator[bytes, None]:
+    request_id = f"chatcmpl-{token_hex(12)}"
+    chunk      = openai_chunker(request_id)
 
-    def chunk(delta: dict, finish_reason: str | None = None) -> str:
-        return openai_chunk(request_id, delta, finish_reason)
-
-    lc_messages = []
-    for m in messages:
-        role    = m.get("role", "")
-        content = m.get("content", "")
-        if role == "user":
-            lc_messages.append(HumanMessage(content=content))
-        elif role == "assistant":
-            lc_messages.append(AIMessage(content=content))
+    lc_messages = [cls(content=m.get("content", ""))
+                   for m in messages if (cls := _ROLE_TO_MESSAGE.get(m.get("role")))]
 
     initial_state: AgentState = {
         "messages":   lc_messages,
@@ -490,28 +767,29 @@ async def run_agent_stream(
     }
 
     thread_config            = {"configurable": {"thread_id": thread_id}}
-    pending_tool_call_ids: list[str] = []
-    had_natural_finish       = False
+    pending_tool_call_ids: deque[str] = deque()
+    flags: dict[str, bool]   = {}
 
-    event_gen = GRAPH.astream_events(initial_state, config=thread_config, version="v2")
+    event_gen = GRAPH.astream_events(
+        initial_state, config=thread_config, version="v2", include_types=_STREAM_EVENT_TYPES,
+        include_names=_STREAM_EVENT_NAMES, durability=_CHECKPOINT_DURABILITY,
+    )
 
-    async for part in _process_events(event_gen, chunk, pending_tool_call_ids):
-        if part == "__HAD_NATURAL_FINISH__":
-            had_natural_finish = True
-        else:
-            yield part
+    async for part in _process_events(event_gen, chunk, pending_tool_call_ids, flags):
+        yield part
 
-    # Check for a pending interrupt (graph suspended waiting for user)
-    if not had_natural_finish:
+    # Neither a final answer nor a streamed interrupt (e.g. step limit hit, or a
+    # LangGraph version that doesn't stream interrupts): read the checkpoint
+    if not flags.get("settled"):
         try:
-            state = await GRAPH.aget_state(thread_config)
-            if state.interrupts:
-                yield sse({"tool_interrupt": state.interrupts[0].value})
-        except Exception as exc:
-            print(f"[agent] Failed to read interrupt state: {exc}")
+            payload = await _pending_interrupt(thread_config)
+            if payload is not None:
+                yield sse({"tool_interrupt": payload})
+        except Exception:
+            _log.exception("[agent] Failed to read interrupt state")
 
-    yield chunk({}, finish_reason="stop")
-    yield "data: [DONE]\n\n"
+    # Closing chunk and [DONE] go out in one write
+    yield chunk({}, finish_reason="stop") + _DONE_FRAME
 
 
 # ---------------------------------------------------------------------------
@@ -521,22 +799,19 @@ async def run_agent_stream(
 async def run_resume_stream(
     thread_id: str,
     action: str,
-) -> AsyncGenerator[str, None]:
-    request_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
-
-    def chunk(delta: dict, finish_reason: str | None = None) -> str:
-        return openai_chunk(request_id, delta, finish_reason)
+) -> AsyncGenerator[bytes, None]:
+    request_id = f"chatcmpl-{token_hex(12)}"
+    chunk      = openai_chunker(request_id)
 
     thread_config = {"configurable": {"thread_id": thread_id}}
 
     # Recover pending tool calls so we can emit synthetic "Running" cards in the UI
     pending_tool_calls: list[dict] = []
     try:
-        state   = await GRAPH.aget_state(thread_config)
-        tc_list = getattr(state.values.get("messages", [])[-1], "tool_calls", []) or []
+        tc_list = _get_tool_calls(await _last_message(thread_config))
         pending_tool_calls = [tc for tc in tc_list if tc["name"] in APPROVAL_REQUIRED_TOOLS]
-    except Exception as exc:
-        print(f"[resume] Failed to read state: {exc}")
+    except Exception:
+        _log.exception("[resume] Failed to read state")
 
     # Synthetic tool-call announcement so UI shows Running → result for any action
     if pending_tool_calls:
@@ -545,45 +820,44 @@ async def run_resume_stream(
                 "index":    i,
                 "id":       tc["id"],
                 "type":     "function",
-                "function": {"name": tc["name"], "arguments": json.dumps(tc["args"])},
+                "function": {"name": tc["name"], "arguments": _json_str(tc["args"])},
             }
             for i, tc in enumerate(pending_tool_calls)
         ]
-        yield chunk({"tool_calls": tc_deltas})
-        yield chunk({}, finish_reason="tool_calls")
+        yield chunk({"tool_calls": tc_deltas}) + chunk({}, finish_reason="tool_calls")
 
-    # Pre-seed the FIFO queue with the IDs from the synthetic announcement so that
-    # on_tool_end events (which lack the original call ID) are matched correctly.
-    pending_tool_call_ids: list[str] = [tc["id"] for tc in pending_tool_calls]
-    had_natural_finish = False
+    # Pre-seed the fallback queue with the IDs from the synthetic announcement so that
+    # any on_tool_end event without a tool_call_id tag is still matched correctly.
+    pending_tool_call_ids: deque[str] = deque(tc["id"] for tc in pending_tool_calls)
+    flags: dict[str, bool] = {}
 
-    event_gen = GRAPH.astream_events(Command(resume=action), config=thread_config, version="v2")
+    event_gen = GRAPH.astream_events(
+        Command(resume=action), config=thread_config, version="v2", include_types=_STREAM_EVENT_TYPES,
+        include_names=_STREAM_EVENT_NAMES, durability=_CHECKPOINT_DURABILITY,
+    )
 
-    async for part in _process_events(event_gen, chunk, pending_tool_call_ids):
-        if part == "__HAD_NATURAL_FINISH__":
-            had_natural_finish = True
-        else:
-            yield part
+    async for part in _process_events(event_gen, chunk, pending_tool_call_ids, flags):
+        yield part
 
     # After a resume the graph may hit ANOTHER interrupt (e.g. second write_database call).
-    # Check for a new pending interrupt, same as run_agent_stream does.
-    if not had_natural_finish:
+    # _process_events streams it; fall back to the checkpoint as run_agent_stream does.
+    if not flags.get("settled"):
         try:
-            state = await GRAPH.aget_state(thread_config)
-            if state.interrupts:
-                yield sse({"tool_interrupt": state.interrupts[0].value})
-        except Exception as exc:
-            print(f"[resume] Failed to read interrupt state: {exc}")
+            payload = await _pending_interrupt(thread_config)
+            if payload is not None:
+                yield sse({"tool_interrupt": payload})
+        except Exception:
+            _log.exception("[resume] Failed to read interrupt state")
 
-    yield chunk({}, finish_reason="stop")
-    yield "data: [DONE]\n\n"
+    # Closing chunk and [DONE] go out in one write
+    yield chunk({}, finish_reason="stop") + _DONE_FRAME
 
 
 # ---------------------------------------------------------------------------
 # FastAPI application
 # ---------------------------------------------------------------------------
 
-app = FastAPI(title="Zola LangGraph Agent Server")
+app = FastAPI(title="Zola LangGraph Agent Server", lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -593,33 +867,49 @@ app.add_middleware(
 )
 
 
-@app.post("/v1/chat/completions")
-async def chat_completions(request: Request):
-    body      = await request.json()
-    messages  = body.get("messages", [])
-    thread_id = body.get("thread_id", f"anon-{uuid.uuid4().hex[:12]}")
+# Frames are pre-encoded by sse()/openai_chunker(), so a plain StreamingResponse
+# is the cheapest transport; these headers keep proxies from buffering it.
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+# Cap on graph runs streaming at once; further requests wait for a slot before
+# their graph starts, so a burst of slow clients can't pile up unbounded runs.
+# Per worker process, like TOOL_CONCURRENCY_LIMIT: the server-wide cap is × WEB_CONCURRENCY
+_AGENT_CONCURRENCY_LIMIT = int(os.environ.get("AGENT_CONCURRENCY_LIMIT", "200"))
+_agent_semaphore         = asyncio.Semaphore(_AGENT_CONCURRENCY_LIMIT)
+
+
+async def _limit_concurrency(frames: AsyncGenerator[bytes, None]) -> AsyncGenerator[bytes, None]:
+    async with _agent_semaphore:
+        async for frame in frames:
+            yield frame
+
 
+def _event_stream_response(frames: AsyncGenerator[bytes, None]) -> StreamingResponse:
     return StreamingResponse(
-        run_agent_stream(messages, thread_id),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        _limit_concurrency(frames), media_type="text/event-stream", headers=_SSE_HEADERS,
     )
 
 
-@app.post("/v1/agent/resume")
+@app.post("/v1/chat/completions", response_class=StreamingResponse)
+async def chat_completions(request: Request):
+    body      = orjson.loads(await request.body())
+    messages  = body.get("messages", [])
+    thread_id = body.get("thread_id", f"anon-{token_hex(6)}")
+
+    return _event_stream_response(run_agent_stream(messages, thread_id))
+
+
+@app.post("/v1/agent/resume", response_class=StreamingResponse)
 async def agent_resume(request: Request):
-    body      = await request.json()
+    body      = orjson.loads(await request.body())
     thread_id = body.get("thread_id", "")
     action    = body.get("action", "denied")
 
     if not thread_id:
-        return {"error": "thread_id is required"}, 400
+        return JSONResponse({"error": "thread_id is required"}, status_code=400)
 
-    return StreamingResponse(
-        run_resume_stream(thread_id, action),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+    return _event_stream_response(run_resume_stream(thread_id, action))
 
 
 @app.get("/v1/models")
@@ -647,4 +937,16 @@ async def health():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    # Paused threads live in the checkpointer, so /v1/agent/resume must reach the
+    # process that saw the interrupt: MemorySaver is per-process and stays on one
+    # worker; with CHECKPOINT_DB all workers share the SQLite file. WEB_CONCURRENCY
+    # overrides either default (use sticky sessions if forcing >1 with MemorySaver).
+    # AGENT_CONCURRENCY_LIMIT and TOOL_CONCURRENCY_LIMIT are per-process semaphores,
+    # so the effective server-wide limits multiply by the worker count.
+    workers = int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 4) if _CHECKPOINT_DB else 1))
+
+    # uvicorn's "auto" loop/parser picks uvloop + httptools when installed
+    # (pip install "uvicorn[standard]") and falls back to asyncio/h11 otherwise;
+    # it needs an import string to spawn more than one worker
+    uvicorn.run("test_agent_server:app" if workers > 1 else app, host="0.0.0.0", port=8000,
+                workers=workers, log_level="info")